@@ -1,22 +1,241 @@
 
+import csv
+import hashlib
 import json
+import os
+import random
+import re
+import string
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from itertools import chain, islice
 from pathlib import Path
 from typing import Dict, List, Optional
 from urllib.error import HTTPError
 
 try:
-    from scribe_data.wikidata.wikidata_utils import sparql
+    from SPARQLWrapper import JSON, POST, SPARQLWrapper
 except ImportError:
     # Fallback if dependencies are not available
     print("Warning: SPARQLWrapper not available. Please install with: pip install SPARQLWrapper")
+    SPARQLWrapper = None
+
+try:
+    from scribe_data.wikidata.wikidata_utils import sparql
+except ImportError:
     sparql = None
 
+try:
+    import requests
+except ImportError:
+    # Optional: direct HTTP access for streamed CSV results and keep-alive.
+    requests = None
+
+try:
+    import orjson
+
+    def _loads(data):
+        return orjson.loads(data)
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+except ImportError:
+    # Optional: orjson is several times faster than the stdlib json for
+    # both decoding metadata and encoding the output dumps.
+    def _loads(data):
+        return json.loads(data)
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+# urllib raises HTTPError; requests raises its own HTTPError subclass.
+HTTP_ERRORS = (HTTPError,) if requests is None else (HTTPError, requests.exceptions.HTTPError)
+
+# Shared session so queries reuse one TCP/TLS connection and receive
+# gzip-compressed responses instead of opening a fresh connection per call.
+if requests is not None:
+    _session = requests.Session()
+    _session.mount(
+        "https://",
+        requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=0),
+    )
+    _session.headers.update({
+        "Accept": "application/sparql-results+json",
+        "Accept-Encoding": "gzip, deflate",
+    })
+else:
+    _session = None
+
+# Wikidata Query Service endpoint (same endpoint scribe_data targets).
+SPARQL_ENDPOINT = "https://query.wikidata.org/sparql"
+SPARQL_AGENT = "filtering.py (https://github.com/scribe-org)"
+
+# Concurrency settings: up to MAX_WORKERS in-flight queries, but globally
+# no more than one request started per MIN_REQUEST_INTERVAL seconds so we
+# stay under the endpoint's rate limits without serial sleeps.
+MAX_WORKERS = 4
+MIN_REQUEST_INTERVAL = 1.5
+
+_request_semaphore = threading.Semaphore(MAX_WORKERS)
+_rate_lock = threading.Lock()
+_next_request_time = 0.0
+
+_thread_local = threading.local()
+
+# On-disk cache of raw query results so interrupted or repeated runs
+# short-circuit to disk instead of re-issuing identical network calls.
+CACHE_DIR = Path("~/.scribe_sparql_cache").expanduser()
+CACHE_TTL = 24 * 60 * 60  # seconds a cached result stays valid
+
+# QIDs in a comboQIDs value always match Q[0-9]+, so one C-level regex
+# pass extracts them without per-element splitting or stripping.
+_QID_RE = re.compile(r"Q\d+")
+
+# Query templates hoisted to module scope so each call only substitutes
+# the QIDs instead of rebuilding the full query text. ($$1 escapes the
+# literal $1 used in the SPARQL REPLACE.)
+_FILTERING_QUERY_TPL = string.Template("""PREFIX wd: <http://www.wikidata.org/entity/>
+PREFIX wikibase: <http://wikiba.se/ontology#>
+PREFIX ontolex: <http://www.w3.org/ns/lemon/ontolex#>
+PREFIX dct: <http://purl.org/dc/terms/>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT ?comboQIDs (COUNT(?form) AS ?formsWithThisCombo) WHERE {
+  {
+    SELECT ?form (GROUP_CONCAT(DISTINCT REPLACE(STR(?feature), ".*/(Q[0-9]+)", "$$1"); separator="|") AS ?comboQIDs) WHERE {
+      ?lexeme dct:language wd:$lang ;
+              wikibase:lexicalCategory wd:$data ;
+              ontolex:lexicalForm ?form .
+      ?form wikibase:grammaticalFeature ?feature .
+    }
+    GROUP BY ?form
+    $limit_clause
+  }
+  FILTER(STRLEN(?comboQIDs) > 0)
+}
+GROUP BY ?comboQIDs
+ORDER BY DESC(?formsWithThisCombo)""")
+
+_ASK_QUERY_TPL = string.Template("""PREFIX wd: <http://www.wikidata.org/entity/>
+PREFIX wikibase: <http://wikiba.se/ontology#>
+PREFIX dct: <http://purl.org/dc/terms/>
+
+ASK WHERE {
+  ?lexeme dct:language wd:$lang .
+  $category_clause
+}""")
+
+_FILTERING_BATCH_QUERY_TPL = string.Template("""PREFIX wd: <http://www.wikidata.org/entity/>
+PREFIX wikibase: <http://wikiba.se/ontology#>
+PREFIX ontolex: <http://www.w3.org/ns/lemon/ontolex#>
+PREFIX dct: <http://purl.org/dc/terms/>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT ?category ?comboQIDs (COUNT(?form) AS ?formsWithThisCombo) WHERE {
+  {
+    SELECT ?category ?form (GROUP_CONCAT(DISTINCT REPLACE(STR(?feature), ".*/(Q[0-9]+)", "$$1"); separator="|") AS ?comboQIDs) WHERE {
+      VALUES ?category { $values_clause }
+      ?lexeme dct:language wd:$lang ;
+              wikibase:lexicalCategory ?category ;
+              ontolex:lexicalForm ?form .
+      ?form wikibase:grammaticalFeature ?feature .
+    }
+    GROUP BY ?category ?form
+    $limit_clause
+  }
+  FILTER(STRLEN(?comboQIDs) > 0)
+}
+GROUP BY ?category ?comboQIDs
+ORDER BY DESC(?formsWithThisCombo)""")
+
+
+def _get_sparql():
+    """
+    Return a SPARQLWrapper instance owned by the calling thread.
+
+    SPARQLWrapper objects carry mutable state (setQuery), so the module-level
+    singleton from scribe_data cannot be shared between worker threads.
+    """
+    if SPARQLWrapper is None:
+        return sparql
+
+    if getattr(_thread_local, "sparql", None) is None:
+        wrapper = SPARQLWrapper(SPARQL_ENDPOINT, agent=SPARQL_AGENT)
+        wrapper.setReturnFormat(JSON)
+        wrapper.setMethod(POST)
+        _thread_local.sparql = wrapper
+
+    return _thread_local.sparql
+
+
+def _acquire_request_slot():
+    """
+    Token-bucket style rate limiting on a monotonic clock: each caller is
+    assigned the next free request slot, spaced MIN_REQUEST_INTERVAL apart.
+    """
+    global _next_request_time
+
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_request_time - now
+        _next_request_time = max(now, _next_request_time) + MIN_REQUEST_INTERVAL
+
+    if wait > 0:
+        time.sleep(wait)
+
+
+def _defer_requests(seconds: float):
+    """
+    Push the global request slot forward so all workers back off together
+    when the server signals rate limiting.
+    """
+    global _next_request_time
+
+    with _rate_lock:
+        _next_request_time = max(_next_request_time, time.monotonic() + seconds)
+
+
+def _retry_after_seconds(error) -> Optional[float]:
+    """
+    Extract the server's Retry-After value from an HTTP error, if present.
+
+    Handles both integer-seconds and HTTP-date forms, and both urllib
+    errors (headers on the error) and requests errors (headers on the
+    attached response).
+    """
+    headers = getattr(error, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is None:
+        return None
+
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
 
 def load_metadata_files(language_metadata_path: str = None, data_type_metadata_path: str = None) -> tuple:
     """
     Load language and data type metadata from JSON files.
-    
+
+    Each file is read in a single read_bytes call and decoded in C,
+    bypassing the buffered TextIOWrapper path entirely.
+
     Parameters
     ----------
     language_metadata_path : str, optional
@@ -37,15 +256,56 @@ def load_metadata_files(language_metadata_path: str = None, data_type_metadata_p
     if data_type_metadata_path is None:
         data_type_metadata_path = current_dir / "resources" / "data_type_metadata.json"
     
-    with open(language_metadata_path, 'r') as f:
-        language_metadata = json.load(f)
-    
-    with open(data_type_metadata_path, 'r') as f:
-        data_type_metadata = json.load(f)
-        
+    language_metadata = _loads(Path(language_metadata_path).read_bytes())
+    data_type_metadata = _loads(Path(data_type_metadata_path).read_bytes())
+
     return language_metadata, data_type_metadata
 
 
+def _stream_sparql_query(query: str) -> Dict:
+    """
+    Execute a SELECT query and stream the CSV response into rows.
+
+    CSV skips the per-value {"type": ..., "value": ...} wrapper dicts of
+    SPARQL-JSON and parses in a fraction of the time, and iterating the
+    response line by line keeps peak memory at one row regardless of
+    result size. (Our queries only return QID lists, URIs and counts, so
+    values never contain embedded newlines.)
+
+    Parameters
+    ----------
+    query : str
+        SPARQL query to execute
+
+    Returns
+    -------
+    Dict
+        {"columns": [column names], "rows": [[value, ...], ...]}
+    """
+    response = _session.get(
+        SPARQL_ENDPOINT,
+        params={"query": query},
+        headers={"User-Agent": SPARQL_AGENT, "Accept": "text/csv"},
+        stream=True,
+        timeout=90,
+    )
+    response.raise_for_status()
+
+    reader = csv.reader(line for line in response.iter_lines(decode_unicode=True) if line)
+    columns = next(reader, [])
+    return {"columns": columns, "rows": list(reader)}
+
+
+def _normalize_sparql_json(converted: Dict) -> Dict:
+    """Flatten a SPARQL-JSON response into the columns/rows shape of the CSV path."""
+    columns = converted.get("head", {}).get("vars", [])
+    rows = [
+        [binding.get(column, {}).get("value", "") for column in columns]
+        for binding in converted.get("results", {}).get("bindings", [])
+    ]
+    return {"columns": columns, "rows": rows}
+
+
 def execute_sparql_with_retry(query: str, max_retries: int = 5, delay: float = 5.0) -> Optional[Dict]:
     """
     Execute SPARQL query with retry logic and timeout handling.
@@ -64,25 +324,38 @@ def execute_sparql_with_retry(query: str, max_retries: int = 5, delay: float = 5
     Optional[Dict]
         Query results or None if failed
     """
-    if sparql is None:
+    stream_available = _session is not None
+    wrapper = None if stream_available else _get_sparql()
+    if not stream_available and wrapper is None:
         print("Error: SPARQL functionality not available. Please install required dependencies.")
         return None
-        
+
     for attempt in range(max_retries):
         try:
-            sparql.setQuery(query)
-            results = sparql.query().convert()
+            with _request_semaphore:
+                _acquire_request_slot()
+                if stream_available:
+                    results = _stream_sparql_query(query)
+                else:
+                    wrapper.setQuery(query)
+                    results = _normalize_sparql_json(wrapper.query().convert())
             return results
-            
-        except HTTPError as e:
+
+        except HTTP_ERRORS as e:
             if "429" in str(e):  # Too Many Requests
-                wait_time = delay * (2 ** attempt)  # Exponential backoff for rate limiting
-                print(f"Rate limited (429) on attempt {attempt + 1}. Waiting {wait_time} seconds...")
+                # Prefer the server's Retry-After over blind backoff, and
+                # jitter so concurrent workers don't retry in lockstep.
+                retry_after = _retry_after_seconds(e)
+                if retry_after is None:
+                    retry_after = delay * (2 ** attempt)  # Exponential backoff for rate limiting
+                wait_time = retry_after + random.uniform(0, 1)
+                print(f"Rate limited (429) on attempt {attempt + 1}. Waiting {wait_time:.1f} seconds...")
+                _defer_requests(wait_time)
                 time.sleep(wait_time)
             else:
                 print(f"HTTPError on attempt {attempt + 1}: {e}")
                 if attempt < max_retries - 1:
-                    time.sleep(delay * (attempt + 1))
+                    time.sleep(delay * (attempt + 1) + random.uniform(0, 1))
                 else:
                     print(f"Max retries ({max_retries}) reached. Query failed.")
                     return None
@@ -105,6 +378,114 @@ def execute_sparql_with_retry(query: str, max_retries: int = 5, delay: float = 5
     return None
 
 
+def _cached_sparql_query(query: str) -> Optional[Dict]:
+    """
+    Execute a SPARQL query through the on-disk cache.
+
+    The cache is content-addressed by a SHA-1 of the query text, so any
+    change to the query naturally produces a fresh entry. Writes go through
+    a temporary file and an atomic rename so a crash never leaves a
+    truncated cache entry behind.
+
+    Parameters
+    ----------
+    query : str
+        SPARQL query to execute
+
+    Returns
+    -------
+    Optional[Dict]
+        Query results or None if failed
+    """
+    key = hashlib.sha1(query.encode()).hexdigest()
+    cache_file = CACHE_DIR / f"{key}.json"
+
+    if cache_file.exists() and time.time() - cache_file.stat().st_mtime < CACHE_TTL:
+        try:
+            cached = _loads(cache_file.read_bytes())
+            # Ignore entries from before the columns/rows result shape.
+            if isinstance(cached, dict) and "rows" in cached:
+                return cached
+        except (OSError, ValueError):
+            pass  # Corrupt or unreadable entry: fall through and re-query.
+
+    results = execute_sparql_with_retry(query)
+
+    if results is not None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file = CACHE_DIR / f"{key}.json.tmp"
+        tmp_file.write_bytes(_dumps(results))
+        tmp_file.replace(cache_file)
+
+    return results
+
+
+def has_any(lang_qid: str, data_qid: str = None) -> bool:
+    """
+    Check whether any lexeme exists for a language (and optional data type).
+
+    Issues a tiny ASK query, which returns in well under a second, so the
+    expensive aggregation query can be skipped entirely for empty
+    combinations. Results are cached on disk like regular query results.
+    On any failure this returns True so a flaky check never skips real data.
+
+    Parameters
+    ----------
+    lang_qid : str
+        Language QID (e.g., "Q1860" for English)
+    data_qid : str, optional
+        Data type QID to additionally require
+
+    Returns
+    -------
+    bool
+        True if at least one matching lexeme exists (or the check failed)
+    """
+    category_clause = f"?lexeme wikibase:lexicalCategory wd:{data_qid} ." if data_qid else ""
+    query = _ASK_QUERY_TPL.substitute(lang=lang_qid, category_clause=category_clause)
+
+    key = hashlib.sha1(query.encode()).hexdigest()
+    cache_file = CACHE_DIR / f"{key}.json"
+
+    if cache_file.exists() and time.time() - cache_file.stat().st_mtime < CACHE_TTL:
+        try:
+            return bool(_loads(cache_file.read_bytes()).get("boolean", True))
+        except (OSError, ValueError):
+            pass  # Corrupt or unreadable entry: fall through and re-query.
+
+    # ASK responses have no bindings, so they bypass the streaming parser.
+    try:
+        if _session is not None:
+            with _request_semaphore:
+                _acquire_request_slot()
+                response = _session.get(
+                    SPARQL_ENDPOINT,
+                    params={"query": query, "format": "json"},
+                    headers={"User-Agent": SPARQL_AGENT},
+                    timeout=30,
+                )
+                response.raise_for_status()
+                results = response.json()
+        else:
+            wrapper = _get_sparql()
+            if wrapper is None:
+                return True
+            with _request_semaphore:
+                _acquire_request_slot()
+                wrapper.setQuery(query)
+                results = wrapper.query().convert()
+    except Exception as e:
+        print(f"ASK query failed for language {lang_qid}: {e}")
+        return True
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_file = CACHE_DIR / f"{key}.json.tmp"
+    tmp_file.write_bytes(_dumps(results))
+    tmp_file.replace(cache_file)
+
+    return bool(results.get("boolean", True))
+
+
 def filtering(lang_qid: str, data_qid: str, use_limit: bool = True, limit_count: int = 1000) -> Optional[List[Dict]]:
     """
     Filter and analyze grammatical feature combinations for lexemes with timeout handling.
@@ -125,53 +506,205 @@ def filtering(lang_qid: str, data_qid: str, use_limit: bool = True, limit_count:
     Optional[List[Dict]]
         List of form combinations with QIDs or None if failed
     """
+    # Cheap pre-flight: skip the aggregation query for empty combinations.
+    if not has_any(lang_qid, data_qid):
+        print(f"No lexemes for language {lang_qid}, data type {data_qid}; skipping")
+        return []
+
     # Simplified and more robust query to prevent syntax errors
-    query = f"""PREFIX wd: <http://www.wikidata.org/entity/>
-PREFIX wikibase: <http://wikiba.se/ontology#>
-PREFIX ontolex: <http://www.w3.org/ns/lemon/ontolex#>
-PREFIX dct: <http://purl.org/dc/terms/>
-PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    query = _FILTERING_QUERY_TPL.substitute(
+        lang=lang_qid,
+        data=data_qid,
+        limit_clause=f"LIMIT {limit_count}" if use_limit else "",
+    )
+
 
-SELECT ?comboQIDs (COUNT(?form) AS ?formsWithThisCombo) WHERE {{
-  {{
-    SELECT ?form (GROUP_CONCAT(DISTINCT REPLACE(STR(?feature), ".*/(Q[0-9]+)", "$1"); separator="|") AS ?comboQIDs) WHERE {{
-      ?lexeme dct:language wd:{lang_qid} ;
-              wikibase:lexicalCategory wd:{data_qid} ;
-              ontolex:lexicalForm ?form .
-      ?form wikibase:grammaticalFeature ?feature .
-    }}
-    GROUP BY ?form
-    {"LIMIT " + str(limit_count) if use_limit else ""}
-  }}
-  FILTER(STRLEN(?comboQIDs) > 0)
-}}
-GROUP BY ?comboQIDs
-ORDER BY DESC(?formsWithThisCombo)"""
-    
     print(f"Executing query for language {lang_qid}, data type {data_qid}")
-    results = execute_sparql_with_retry(query)
+    results = _cached_sparql_query(query)
     
     if results is None:
         return None
-        
+
     # Process results
-    bindings = results.get("results", {}).get("bindings", [])
+    columns = results.get("columns", [])
+    try:
+        combo_idx = columns.index("comboQIDs")
+        count_idx = columns.index("formsWithThisCombo")
+    except ValueError:
+        return []
+
     processed_results = []
-    
-    for binding in bindings:
-        combo_qids = binding.get("comboQIDs", {}).get("value", "")
-        form_count = binding.get("formsWithThisCombo", {}).get("value", "0")
-        
+
+    for row in results.get("rows", []):
+        combo_qids = row[combo_idx]
+
         if combo_qids:  # Only include results with QIDs
-            qid_list = [qid.strip() for qid in combo_qids.split("|") if qid.strip()]
+            qid_list = _QID_RE.findall(combo_qids)
             processed_results.append({
                 "qids": qid_list,
-                "count": int(form_count)
+                "count": int(row[count_idx] or 0)
             })
-    
+
+    return processed_results
+
+
+def iter_lang_qids(language_metadata: Dict):
+    """
+    Yield (qid, name) pairs from nested language metadata.
+
+    Sub-languages are flattened as "<language>_<sub_language>". Being a
+    generator, callers that only need the first few languages stop the
+    scan early with islice instead of walking the whole mapping.
+
+    Parameters
+    ----------
+    language_metadata : Dict
+        Parsed language_metadata.json contents
+
+    Yields
+    ------
+    tuple
+        (language QID, language name)
+    """
+    for lang_name, lang_data in language_metadata.items():
+        if "qid" in lang_data:
+            yield lang_data["qid"], lang_name
+        elif "sub_languages" in lang_data:
+            for sub_lang_name, sub_lang_data in lang_data["sub_languages"].items():
+                if "qid" in sub_lang_data:
+                    yield sub_lang_data["qid"], f"{lang_name}_{sub_lang_name}"
+
+
+# (mtime_ns, mapping) per metadata file so both process_* functions share
+# one flattening pass until the file itself changes.
+_language_qids_cache: Dict[str, tuple] = {}
+
+
+def get_language_qids(language_metadata: Dict, language_metadata_path: str = None) -> Dict[str, str]:
+    """
+    Build the {language QID: name} mapping, cached by metadata file mtime.
+
+    Parameters
+    ----------
+    language_metadata : Dict
+        Parsed language_metadata.json contents
+    language_metadata_path : str, optional
+        Path the metadata was loaded from, used as the cache key
+
+    Returns
+    -------
+    Dict[str, str]
+        Mapping of language QID to (flattened) language name
+    """
+    if language_metadata_path is None:
+        language_metadata_path = Path(__file__).parent.parent.parent / "resources" / "language_metadata.json"
+
+    path = Path(language_metadata_path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        # No file to key on (e.g., metadata built in memory): just flatten.
+        return dict(iter_lang_qids(language_metadata))
+
+    cached = _language_qids_cache.get(str(path))
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    mapping = dict(iter_lang_qids(language_metadata))
+    _language_qids_cache[str(path)] = (mtime, mapping)
+    return mapping
+
+
+def filtering_batch(lang_qid: str, data_qids: List[str], use_limit: bool = True, limit_count: int = 1000) -> Optional[Dict[str, List[Dict]]]:
+    """
+    Filter grammatical feature combinations for all data types of a language in one query.
+
+    Uses a VALUES clause over the lexical category QIDs so a single round trip
+    replaces one query per (language, data type) combination.
+
+    Parameters
+    ----------
+    lang_qid : str
+        Language QID (e.g., "Q1860" for English)
+    data_qids : List[str]
+        Data type QIDs to cover (e.g., ["Q1084", "Q24905"])
+    use_limit : bool, default True
+        Whether to limit results to prevent timeouts
+    limit_count : int, default 1000
+        Maximum number of forms to consider across all data types
+
+    Returns
+    -------
+    Optional[Dict[str, List[Dict]]]
+        Mapping of data type QID to its form combinations, or None if failed
+    """
+    # Cheap pre-flight: skip the aggregation query for languages with no lexemes.
+    if not has_any(lang_qid):
+        print(f"No lexemes for language {lang_qid}; skipping")
+        return {data_qid: [] for data_qid in data_qids}
+
+    query = _FILTERING_BATCH_QUERY_TPL.substitute(
+        lang=lang_qid,
+        values_clause=" ".join(f"wd:{qid}" for qid in data_qids),
+        limit_clause=f"LIMIT {limit_count}" if use_limit else "",
+    )
+
+    print(f"Executing batched query for language {lang_qid} ({len(data_qids)} data types)")
+    results = _cached_sparql_query(query)
+
+    if results is None:
+        return None
+
+    # Bucket results by lexical category QID.
+    processed_results = {data_qid: [] for data_qid in data_qids}
+
+    columns = results.get("columns", [])
+    try:
+        category_idx = columns.index("category")
+        combo_idx = columns.index("comboQIDs")
+        count_idx = columns.index("formsWithThisCombo")
+    except ValueError:
+        return processed_results
+
+    for row in results.get("rows", []):
+        category_qid = row[category_idx].rsplit("/", 1)[-1]
+        combo_qids = row[combo_idx]
+
+        if combo_qids and category_qid in processed_results:
+            qid_list = _QID_RE.findall(combo_qids)
+            processed_results[category_qid].append({
+                "qids": qid_list,
+                "count": int(row[count_idx] or 0)
+            })
+
     return processed_results
 
 
+def _load_resumable_output(output_path: Path) -> Dict:
+    """Load a previous run's output so completed languages can be skipped."""
+    if output_path.exists():
+        try:
+            return _loads(output_path.read_bytes())
+        except (OSError, ValueError):
+            pass  # Corrupt file: start over rather than resume from bad data.
+    return {}
+
+
+def _write_output_atomic(output_path: Path, output_data: Dict):
+    """Write output through a temp file and atomic rename, never a torn file."""
+    tmp_file = output_path.with_suffix(".json.tmp")
+    tmp_file.write_bytes(_dumps(output_data))
+    os.replace(tmp_file, output_path)
+
+
+def _language_done(lang_results: Dict, data_type_qids: List[str]) -> bool:
+    """A language is resumable-complete if every data type is present and any has data."""
+    return (
+        all(qid in lang_results for qid in data_type_qids)
+        and any(lang_results[qid] for qid in data_type_qids)
+    )
+
+
 def process_all_languages_and_types(
     language_metadata_path: str = None, 
     data_type_metadata_path: str = None,
@@ -198,57 +731,71 @@ def process_all_languages_and_types(
         language_metadata_path, data_type_metadata_path
     )
     
-    # Build the output structure
-    output_data = {}
-    
-    # Extract language QIDs
-    language_qids = {}
-    for lang_name, lang_data in language_metadata.items():
-        if "qid" in lang_data:
-            language_qids[lang_data["qid"]] = lang_name
-        elif "sub_languages" in lang_data:
-            for sub_lang_name, sub_lang_data in lang_data["sub_languages"].items():
-                if "qid" in sub_lang_data:
-                    language_qids[sub_lang_data["qid"]] = f"{lang_name}_{sub_lang_name}"
-    
-    # Process each language and data type combination
-    total_combinations = len(language_qids) * len(data_type_metadata)
-    current_combination = 0
-    
-    for lang_qid, lang_name in language_qids.items():
-        print(f"\nProcessing language: {lang_name} ({lang_qid})")
-        output_data[lang_qid] = {}
-        
-        for data_type_name, data_type_qid in data_type_metadata.items():
-            if not data_type_qid:  # Skip empty QIDs
-                continue
-                
-            current_combination += 1
-            print(f"  Processing {data_type_name} ({data_type_qid}) - {current_combination}/{total_combinations}")
-            
-            # Get filtered results for this combination
-            results = filtering(lang_qid, data_type_qid)
-            
-            if results is not None:
-                # Extract unique QID forms
-                unique_qid_forms = set()
-                for result in results:
-                    for qid in result["qids"]:
-                        unique_qid_forms.add(qid)
-                
-                output_data[lang_qid][data_type_qid] = sorted(list(unique_qid_forms))
-                print(f"    Found {len(unique_qid_forms)} unique QID forms")
-            else:
-                output_data[lang_qid][data_type_qid] = []
-                print("    No results (timeout or error)")
-            
-            # Longer delay to prevent rate limiting (429 errors)
-            time.sleep(10)  # 10 second delay between requests
-    
+    # Build the output structure, resuming from any previous run's output.
+    output_path = Path(output_file)
+    output_data = _load_resumable_output(output_path)
+
+    # Extract language QIDs (shared, mtime-cached mapping)
+    language_qids = get_language_qids(language_metadata, language_metadata_path)
+
+    # One batched query per language covers every data type at once.
+    data_type_qids = [qid for qid in data_type_metadata.values() if qid]
+
+    for lang_qid in language_qids:
+        output_data.setdefault(lang_qid, {})
+
+    # Only query languages the previous run didn't finish.
+    pending = {
+        lang_qid: lang_name
+        for lang_qid, lang_name in language_qids.items()
+        if not _language_done(output_data[lang_qid], data_type_qids)
+    }
+    if len(pending) < len(language_qids):
+        print(f"Resuming: {len(language_qids) - len(pending)} languages already complete in {output_file}")
+
+    total_languages = len(pending)
+    completed = 0
+
+    # Run the network-bound queries concurrently; the shared rate limiter in
+    # execute_sparql_with_retry keeps us under the endpoint's request limits.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        future_to_lang = {
+            executor.submit(filtering_batch, lang_qid, data_type_qids): (lang_qid, lang_name)
+            for lang_qid, lang_name in pending.items()
+        }
+
+        for future in as_completed(future_to_lang):
+            lang_qid, lang_name = future_to_lang[future]
+            completed += 1
+            print(f"Completed language {lang_name} ({lang_qid}) - {completed}/{total_languages}")
+
+            batch_results = future.result()
+
+            for data_type_qid in data_type_qids:
+                results = batch_results.get(data_type_qid) if batch_results is not None else None
+
+                if results is not None:
+                    # Extract unique QID forms in one pass; dict.fromkeys
+                    # dedupes in C while preserving result order.
+                    unique_qid_forms = list(dict.fromkeys(
+                        chain.from_iterable(result["qids"] for result in results)
+                    ))
+
+                    output_data[lang_qid][data_type_qid] = unique_qid_forms
+                    print(f"    {data_type_qid}: {len(unique_qid_forms)} unique QID forms")
+                else:
+                    output_data[lang_qid][data_type_qid] = []
+                    print(f"    {data_type_qid}: no results (timeout or error)")
+
+            # Write through after each language so an interrupted run resumes
+            # here instead of redoing completed work.
+            _write_output_atomic(output_path, output_data)
+
+
     # Save results
-    with open(output_file, 'w') as f:
-        json.dump(output_data, f, indent=2)
-    
+    _write_output_atomic(output_path, output_data)
+
+
     print(f"\nResults saved to {output_file}")
     return output_data
 
@@ -285,71 +832,78 @@ def process_limited_subset(
         language_metadata_path, data_type_metadata_path
     )
     
-    # Build the output structure
-    output_data = {}
-    
-    # Extract language QIDs (limited)
-    language_qids = {}
-    count = 0
-    for lang_name, lang_data in language_metadata.items():
-        if count >= max_languages:
-            break
-        if "qid" in lang_data:
-            language_qids[lang_data["qid"]] = lang_name
-            count += 1
-        elif "sub_languages" in lang_data:
-            for sub_lang_name, sub_lang_data in lang_data["sub_languages"].items():
-                if count >= max_languages:
-                    break
-                if "qid" in sub_lang_data:
-                    language_qids[sub_lang_data["qid"]] = f"{lang_name}_{sub_lang_name}"
-                    count += 1
-    
+    # Build the output structure, resuming from any previous run's output.
+    output_path = Path(output_file)
+    output_data = _load_resumable_output(output_path)
+
+    # Extract language QIDs (limited) from the shared, mtime-cached mapping.
+    language_qids = dict(islice(
+        get_language_qids(language_metadata, language_metadata_path).items(), max_languages
+    ))
+
     # Limit data types
     limited_data_types = dict(list(data_type_metadata.items())[:max_data_types])
-    
-    # Process each language and data type combination
-    total_combinations = len(language_qids) * len(limited_data_types)
-    current_combination = 0
-    
+
+    # One batched query per language covers every data type at once.
+    data_type_qids = [qid for qid in limited_data_types.values() if qid]
+
+    for lang_qid in language_qids:
+        output_data.setdefault(lang_qid, {})
+
+    # Only query languages the previous run didn't finish.
+    pending = {
+        lang_qid: lang_name
+        for lang_qid, lang_name in language_qids.items()
+        if not _language_done(output_data[lang_qid], data_type_qids)
+    }
+    if len(pending) < len(language_qids):
+        print(f"Resuming: {len(language_qids) - len(pending)} languages already complete in {output_file}")
+
+    total_languages = len(pending)
+    completed = 0
+
     print(f"Processing {len(language_qids)} languages and {len(limited_data_types)} data types")
-    print(f"Total combinations: {total_combinations}")
-    
-    for lang_qid, lang_name in language_qids.items():
-        print(f"\nProcessing language: {lang_name} ({lang_qid})")
-        output_data[lang_qid] = {}
-        
-        for data_type_name, data_type_qid in limited_data_types.items():
-            if not data_type_qid:  # Skip empty QIDs
-                continue
-                
-            current_combination += 1
-            print(f"  Processing {data_type_name} ({data_type_qid}) - {current_combination}/{total_combinations}")
-            
-            # Get filtered results for this combination with smaller limit
-            results = filtering(lang_qid, data_type_qid, use_limit=True, limit_count=100)
-            
-            if results is not None:
-                # Extract unique QID forms
-                unique_qid_forms = set()
-                for result in results:
-                    for qid in result["qids"]:
-                        unique_qid_forms.add(qid)
-                
-                output_data[lang_qid][data_type_qid] = sorted(list(unique_qid_forms))
-                print(f"    Found {len(unique_qid_forms)} unique QID forms")
-            else:
-                output_data[lang_qid][data_type_qid] = []
-                print("    No results (timeout or error)")
-            
-            # Even longer delay for limited processing to be extra safe
-            print("    Waiting 15 seconds before next request...")
-            time.sleep(15)  # 15 second delay between requests
-    
+
+    # Run the network-bound queries concurrently; the shared rate limiter in
+    # execute_sparql_with_retry keeps us under the endpoint's request limits.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        future_to_lang = {
+            executor.submit(filtering_batch, lang_qid, data_type_qids, True, 100): (lang_qid, lang_name)
+            for lang_qid, lang_name in pending.items()
+        }
+
+        for future in as_completed(future_to_lang):
+            lang_qid, lang_name = future_to_lang[future]
+            completed += 1
+            print(f"Completed language {lang_name} ({lang_qid}) - {completed}/{total_languages}")
+
+            batch_results = future.result()
+
+            for data_type_qid in data_type_qids:
+                results = batch_results.get(data_type_qid) if batch_results is not None else None
+
+                if results is not None:
+                    # Extract unique QID forms in one pass; dict.fromkeys
+                    # dedupes in C while preserving result order.
+                    unique_qid_forms = list(dict.fromkeys(
+                        chain.from_iterable(result["qids"] for result in results)
+                    ))
+
+                    output_data[lang_qid][data_type_qid] = unique_qid_forms
+                    print(f"    {data_type_qid}: {len(unique_qid_forms)} unique QID forms")
+                else:
+                    output_data[lang_qid][data_type_qid] = []
+                    print(f"    {data_type_qid}: no results (timeout or error)")
+
+            # Write through after each language so an interrupted run resumes
+            # here instead of redoing completed work.
+            _write_output_atomic(output_path, output_data)
+
+
     # Save results
-    with open(output_file, 'w') as f:
-        json.dump(output_data, f, indent=2)
-    
+    _write_output_atomic(output_path, output_data)
+
+
     print(f"\nResults saved to {output_file}")
     return output_data
 
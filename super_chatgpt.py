@@ -14,54 +14,111 @@ Features:
 import os
 import sys
 import json
-import time
-import tempfile
-import threading
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-import subprocess
-import shlex
 
-# ======= If you use the official OpenAI python package, uncomment this =======
-# pip install openai
-try:
-    import openai
-except Exception:
-    openai = None
+# Heavy or rarely needed modules (openai, subprocess, resource, ...) are
+# imported lazily inside the functions that use them, keeping cold start
+# cheap for users who exit before chatting or running code.
 
 # -------------------------
 # Configuration / Defaults
 # -------------------------
 DEFAULT_MODEL = os.environ.get("SUPER_CHAT_MODEL", "gpt-5-thinking-mini")  # replace if needed
 CONVERSATIONS_DIR = Path.home() / ".super_chatgpt"
-CONVERSATIONS_DIR.mkdir(parents=True, exist_ok=True)
 DEFAULT_CONV_FILE = CONVERSATIONS_DIR / "default_conversation.json"
 API_KEY = os.environ.get("OPENAI_API_KEY") or os.environ.get("OPENAI_API_KEY_OPENAI")  # support multiple names
 
-if not API_KEY:
-    print("Warning: OPENAI_API_KEY not set. You must set it to use the API.")
-else:
-    if openai:
-        openai.api_key = API_KEY
+_openai = None
+_openai_checked = False
+
+
+def _get_openai():
+    """Import and configure the openai package on first use (or None if missing)."""
+    global _openai, _openai_checked
+    if not _openai_checked:
+        _openai_checked = True
+        try:
+            import openai
+        except Exception:
+            openai = None
+
+        if not API_KEY:
+            print("Warning: OPENAI_API_KEY not set. You must set it to use the API.")
+        elif openai:
+            openai.api_key = API_KEY
+        _openai = openai
+    return _openai
+
+
+def _ensure_dir():
+    """Create the conversations directory on first save/load."""
+    CONVERSATIONS_DIR.mkdir(parents=True, exist_ok=True)
 
 
 # -------------------------
 # Helpers
 # -------------------------
-def save_conversation(messages: List[Dict[str, str]], filename: Path = DEFAULT_CONV_FILE):
-    """Save conversation (list of messages) to JSON."""
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(messages, f, indent=2, ensure_ascii=False)
-    print(f"[saved] conversation to {filename}")
+def save_conversation(messages: List[Dict[str, str]], filename: Path = DEFAULT_CONV_FILE, start: int = 0):
+    """
+    Append messages[start:] to the conversation file as JSONL.
+
+    One message per line keeps saves O(new messages) instead of rewriting
+    the whole history on every :save. A file still in the legacy
+    single-array format is rewritten as JSONL once before the append, so
+    old conversations migrate instead of being corrupted.
+    """
+    _ensure_dir()
+    filename = Path(filename)
+    if filename.exists():
+        text = filename.read_text(encoding="utf-8")
+        if text.lstrip().startswith("["):
+            try:
+                legacy = json.loads(text)
+            except json.JSONDecodeError:
+                legacy = []
+            if not isinstance(legacy, list):
+                legacy = []
+            with open(filename, "w", encoding="utf-8") as f:
+                for msg in legacy:
+                    f.write(json.dumps(msg, ensure_ascii=False) + "\n")
+
+    with open(filename, "a", encoding="utf-8") as f:
+        for msg in messages[start:]:
+            f.write(json.dumps(msg, ensure_ascii=False) + "\n")
+    print(f"[saved] {len(messages) - start} new message(s) to {filename}")
+
+
+# (mtime_ns, parsed messages) per file so repeated :load calls cost one
+# stat syscall instead of a full JSON re-parse.
+_CONV_CACHE: Dict[Path, tuple] = {}
 
 
 def load_conversation(filename: Path = DEFAULT_CONV_FILE) -> List[Dict[str, str]]:
     """Load conversation messages from JSON file; returns a list of messages."""
     if filename.exists():
-        with open(filename, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, list):
-                return data
+        st = filename.stat()
+        cached = _CONV_CACHE.get(filename)
+        if cached and cached[0] == st.st_mtime_ns:
+            return list(cached[1])  # copy so callers can't mutate the cache
+
+        text = filename.read_text(encoding="utf-8")
+        try:
+            if text.lstrip().startswith("["):
+                # Legacy format: one JSON array holding the whole conversation.
+                data = json.loads(text)
+                if not isinstance(data, list):
+                    data = []
+            else:
+                data = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except json.JSONDecodeError:
+            # A corrupt file degrades to an empty conversation rather than
+            # crashing the REPL at startup.
+            print(f"[load error] could not parse {filename}; starting with an empty conversation")
+            return []
+
+        _CONV_CACHE[filename] = (st.st_mtime_ns, data)
+        return list(data)
     return []
 
 
@@ -78,15 +135,14 @@ def run_python_sandbox(code: str, timeout: int = 4) -> Dict[str, Any]:
     """
     Execute Python code in a subprocess with a timeout.
     WARNING: sandbox is lightweight. Do NOT run untrusted code from strangers in production.
-    This will run "python -I" in a subprocess (isolated mode) and capture stdout/stderr.
+    This pipes the code to "python -I -" over stdin (isolated mode) and captures
+    stdout/stderr — no temp file to write, remove, or leak on a crash.
     On Unix systems we also attempt to apply resource limits if available.
     """
-    # Create a temporary file containing the code
-    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as tf:
-        tf.write(code)
-        tmp_path = tf.name
+    import signal
+    import subprocess
 
-    python_cmd = [sys.executable, "-I", tmp_path]  # -I isolates environment vars a bit
+    python_cmd = [sys.executable, "-I", "-"]  # -I isolates environment vars a bit; - reads stdin
     proc = None
     try:
         # On Unix we can set resource limits via preexec_fn
@@ -105,22 +161,22 @@ def run_python_sandbox(code: str, timeout: int = 4) -> Dict[str, Any]:
 
         proc = subprocess.Popen(
             python_cmd,
+            stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
             preexec_fn=preexec_fn,
+            start_new_session=True,  # own process group so a timeout can reap grandchildren
         )
-        stdout, stderr = proc.communicate(timeout=timeout)
+        stdout, stderr = proc.communicate(input=code, timeout=timeout)
         return {"returncode": proc.returncode, "stdout": stdout, "stderr": stderr}
     except subprocess.TimeoutExpired:
         if proc:
-            proc.kill()
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except Exception:
+                proc.kill()
         return {"error": "timeout", "stdout": "", "stderr": "Execution timed out"}
-    finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
 
 
 # -------------------------
@@ -130,6 +186,7 @@ class SuperChat:
     def __init__(self, model: str = DEFAULT_MODEL, system_prompt: Optional[str] = None):
         self.model = model
         self.messages: List[Dict[str, str]] = []
+        self._has_system = False  # maintained at insert/load time; avoids O(N) scans
         if system_prompt is None:
             system_prompt = (
                 "You are a helpful, concise, and safe AI assistant. When the user asks to run python code, "
@@ -137,11 +194,14 @@ class SuperChat:
                 "If asked for potentially dangerous content, refuse and provide alternatives."
             )
         self.system_prompt = system_prompt
+        self.max_history = 40  # most recent messages sent per request (plus system)
+        self._saved_upto = 0  # index of the first message not yet flushed to disk
         self._ensure_system_message()
 
     def _ensure_system_message(self):
-        if not any(m["role"] == "system" for m in self.messages):
+        if not self._has_system:
             self.messages.insert(0, {"role": "system", "content": self.system_prompt})
+            self._has_system = True
 
     def add_user_message(self, text: str):
         self.messages.append({"role": "user", "content": text})
@@ -150,11 +210,18 @@ class SuperChat:
         self.messages.append({"role": "assistant", "content": text})
 
     def save(self, filename: Path = DEFAULT_CONV_FILE):
-        save_conversation(self.messages, filename)
+        save_conversation(self.messages, filename, start=self._saved_upto)
+        self._saved_upto = len(self.messages)
 
     def load(self, filename: Path = DEFAULT_CONV_FILE):
         self.messages = load_conversation(filename)
+        # A saved conversation always has its system message at index 0,
+        # so one index check replaces a linear scan of the history.
+        self._has_system = bool(self.messages and self.messages[0]["role"] == "system")
         self._ensure_system_message()
+        # Everything now in memory is already on disk (or was reinserted
+        # scaffolding); only messages added after this point need flushing.
+        self._saved_upto = len(self.messages)
 
     def ask(self, prompt: str, stream: bool = False) -> str:
         """
@@ -164,6 +231,14 @@ class SuperChat:
         """
         self.add_user_message(prompt)
 
+        # Cap the payload to the system message plus the last max_history
+        # messages so per-turn upload and token cost stay bounded instead
+        # of growing with the full conversation length.
+        send = self.messages
+        if len(send) > self.max_history + 1:
+            send = [self.messages[0]] + self.messages[-self.max_history:]
+
+        openai = _get_openai()
         if openai is None:
             # Fallback local toy response (no API)
             assistant_text = "[toy assistant response] (no openai package installed)"
@@ -179,7 +254,7 @@ class SuperChat:
                 print("[streaming response] ", end="", flush=True)
                 stream_resp = openai.ChatCompletion.create(
                     model=self.model,
-                    messages=self.messages,
+                    messages=send,
                     stream=True,
                     temperature=0.2,
                     max_tokens=800,
@@ -208,7 +283,7 @@ class SuperChat:
                 # non-streaming
                 resp = openai.ChatCompletion.create(
                     model=self.model,
-                    messages=self.messages,
+                    messages=send,
                     temperature=0.2,
                     max_tokens=1000,
                 )